@@ -7,28 +7,184 @@ Supports both API token and Personal Access Token authentication.
 """
 
 import argparse
+import copy
 import os
 import sys
-from typing import Optional, Dict, Any
-import requests
-from urllib.parse import urljoin, urlparse
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Dict, Any, BinaryIO, Callable, Iterator, List, Tuple, Union
+from urllib.parse import urljoin, urlparse, parse_qs
 import base64
-from markdownify import markdownify
-from bs4 import BeautifulSoup
+import hashlib
+import importlib.util
 import json
+import logging
+import re
 from pathlib import Path
-import getpass
 import tempfile
-import subprocess
 import shutil
-import markdown
+import threading
+import time
+from functools import lru_cache
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # optional, faster JSON encoding/decoding
+except ImportError:
+    orjson = None
+
+# Connections kept per host; must be >= the number of concurrent workers
+DEFAULT_POOL_SIZE = 50
+# Retries for rate limiting (429) and transient server errors
+DEFAULT_MAX_RETRIES = 3
+# Concurrent requests used by the bulk helpers
+DEFAULT_WORKERS = 8
+# Seconds a fetched page is reused by read-only actions
+DEFAULT_PAGE_CACHE_TTL = 60
+# Characters encoded per write when streaming a document
+_WRITE_CHUNK_CHARS = 1 << 20
+# Fetched pages a client remembers for reuse and ETag revalidation
+MAX_FETCHED_PAGES = 16
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+
+# First all-digit path segment after /pages/, e.g. /spaces/KEY/pages/123/Title
+_PAGE_ID_PATH_RE = re.compile(r'/pages/(?:[^/]+/)*?(\d+)(?:/|$)')
+
+
+def _redact_headers(headers) -> Dict[str, str]:
+    """Copy request headers for display with credentials masked."""
+    return {name: '***' if name.lower() == 'authorization' else value
+            for name, value in headers.items()}
+
+
+def _preview(response: 'requests.Response', limit: int = 500) -> str:
+    """Decode only the start of a response body for debug output."""
+    return response.content[:limit].decode(response.encoding or 'utf-8', errors='replace')
+
+
+@lru_cache(maxsize=1)
+def _lazy_html_converter():
+    """Import the HTML -> Markdown toolchain on first use."""
+    from bs4 import BeautifulSoup
+    from markdownify import MarkdownConverter
+    converter = MarkdownConverter(
+        heading_style="ATX",
+        bullets="-",
+        strip=['script', 'style']
+    )
+    has_lxml = importlib.util.find_spec('lxml') is not None
+    return BeautifulSoup, converter, has_lxml
+
+
+@lru_cache(maxsize=1)
+def _lazy_markdown():
+    """Import the Markdown -> HTML library on first use."""
+    import markdown
+    return markdown
+
+
+_markdown_local = threading.local()
+
+
+def _markdown_converter():
+    """
+    Return this thread's markdown.Markdown instance, creating it on first use.
+
+    Building the instance registers every extension's processors, so it is
+    reused and reset() between documents instead. Instances hold per-document
+    state and are not thread-safe, hence one per thread.
+    """
+    md = getattr(_markdown_local, 'md', None)
+    if md is None:
+        markdown = _lazy_markdown()
+        md = _markdown_local.md = markdown.Markdown(extensions=['tables', 'fenced_code'])
+    return md
+
+
+# Kept small: keys and results are whole pages
+@lru_cache(maxsize=4)
+def _convert_html_to_markdown(html_content: str) -> str:
+    """Convert HTML to Markdown, memoized so a page rendered twice is converted once."""
+    BeautifulSoup, converter, has_lxml = _lazy_html_converter()
+
+    # lxml parses much faster than the pure-Python html.parser, but it turns
+    # CDATA sections (used for code macro bodies) into comments, dropping them
+    parser = 'lxml' if has_lxml and '<![CDATA[' not in html_content else 'html.parser'
+
+    # Clean up HTML first
+    soup = BeautifulSoup(html_content, parser)
+
+    # Convert the parsed tree directly; markdownify(str(soup)) would serialize
+    # it back to HTML only for markdownify to parse it again
+    markdown = converter.convert_soup(soup)
+
+    return markdown.strip()
+
+
+# Kept small: keys and results are whole documents
+@lru_cache(maxsize=4)
+def _convert_markdown_to_html(markdown_content: str) -> str:
+    """Convert Markdown to HTML, memoized so retried or repeated content is parsed once."""
+    # Use markdown library with table support
+    md = _markdown_converter()
+    md.reset()
+    return md.convert(markdown_content)
+
+
+@lru_cache(maxsize=8)
+def _find_editor(editor: Optional[str]) -> str:
+    """
+    Resolve the editor to launch, preferring $EDITOR.
+
+    Each shutil.which() call walks $PATH, which is slow on Windows and network
+    mounts, so the result is remembered per $EDITOR value.
+    """
+    # Try EDITOR environment variable first
+    if editor and shutil.which(editor):
+        return editor
+
+    # Try common editors
+    editors = ['code', 'vim', 'nano', 'emacs', 'gedit', 'notepad++']
+
+    for ed in editors:
+        if shutil.which(ed):
+            return ed
+
+    # Last resort
+    if os.name == 'nt':  # Windows
+        return 'notepad'
+    else:
+        return 'vi'  # Should be available on all Unix systems
 
 
 class ConfluenceClient:
     """Client for Confluence Data Center API operations."""
     
     def __init__(self, base_url: str, username: Optional[str] = None, 
-                 password: Optional[str] = None, token: Optional[str] = None):
+                 password: Optional[str] = None, token: Optional[str] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 page_cache: Optional['PageCache'] = None,
+                 cache_ttl: float = 0,
+                 debug: bool = False,
+                 compress_uploads: bool = False):
         """
         Initialize Confluence client.
         
@@ -37,10 +193,51 @@ class ConfluenceClient:
             username: Username for basic auth (used with password)
             password: Password or API token for basic auth
             token: Personal Access Token for bearer auth
+            pool_size: Maximum number of pooled connections to the server
+            max_retries: Retries for 429/5xx responses and connection errors
+            page_cache: Optional on-disk cache for page reads (read-only use only,
+                as cached pages may carry a stale version number)
+            cache_ttl: Seconds a page fetched by this client is reused before it
+                is revalidated with the server (0: always revalidate)
+            debug: Log request/response diagnostics
+            compress_uploads: gzip page bodies sent to the server (some
+                reverse proxies in front of Data Center reject this)
         """
+        self.debug = debug
+        self.compress_uploads = compress_uploads
         self.base_url = base_url.rstrip('/')
         self.api_base = f"{self.base_url}/rest/api"
+        self.page_cache = page_cache
+        self.cache_ttl = cache_ttl
+        # page_id -> (fetched at, ETag, page data), least recently used first
+        self._fetched_pages: 'OrderedDict[str, Tuple[float, Optional[str], dict]]' = OrderedDict()
+        self._fetched_lock = threading.Lock()
+        # Imported here so config-only commands don't pay for loading requests
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
         self.session = requests.Session()
+
+        # Exponential backoff with jitter so parallel workers don't retry in
+        # lockstep; Retry-After from a rate-limited server takes precedence.
+        # POST is not retried because page creation is not idempotent.
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=1.0,
+            backoff_jitter=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'PUT']),
+            respect_retry_after_header=True,
+            raise_on_status=False  # hand the final response to our error handling
+        )
+
+        # The default adapter keeps only 10 connections, which throttles
+        # concurrent use of the shared session (e.g. --url-file)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size * 2,
+                              max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
         # Set up authentication
         if token:
@@ -50,17 +247,19 @@ class ConfluenceClient:
                 # Method 1: Token as password with username (common for DC)
                 auth_string = base64.b64encode(f"{username}:{token}".encode()).decode()
                 self.session.headers.update({'Authorization': f'Basic {auth_string}'})
-                print(f"DEBUG: Using token as password with username: {username}")
+                self._debug(f"Using token as password with username: {username}")
             else:
                 # Method 2: Bearer token (OAuth style)
                 self.session.headers.update({'Authorization': f'Bearer {token}'})
-                print(f"DEBUG: Using Bearer token authentication")
+                self._debug("Using Bearer token authentication")
         elif username and password:
-            # Regular username/password authentication
-            auth_string = base64.b64encode(f"{username}:{password}".encode()).decode()
+            # Regular username/password authentication. The header is built
+            # once here; setting session.auth as well made requests re-encode
+            # it on every request. Latin-1 matches what requests sent, and what
+            # Tomcat's Basic authenticator expects by default.
+            auth_string = base64.b64encode(f"{username}:{password}".encode('latin-1')).decode()
             self.session.headers.update({'Authorization': f'Basic {auth_string}'})
-            self.session.auth = (username, password)  # Add this for requests library
-            print(f"DEBUG: Using Basic authentication with username: {username}")
+            self._debug(f"Using Basic authentication with username: {username}")
         else:
             raise ValueError("Either token or username/password must be provided")
         
@@ -69,26 +268,39 @@ class ConfluenceClient:
             'Accept': 'application/json'
         })
     
+    def clear_cache(self) -> None:
+        """Forget fetched pages and memoized conversions held in this process."""
+        with self._fetched_lock:
+            self._fetched_pages.clear()
+        _convert_html_to_markdown.cache_clear()
+        _convert_markdown_to_html.cache_clear()
+
+    def _debug(self, message: Union[str, Callable[[], str]]) -> None:
+        """Print a debug message; pass a callable to defer building costly ones."""
+        if self.debug:
+            logger.debug(message() if callable(message) else message)
+
     def test_authentication(self) -> dict:
         """Test authentication by getting current user info."""
         url = f"{self.api_base}/user/current"
-        print(f"DEBUG: Testing authentication at: {url}")
+        self._debug(f"Testing authentication at: {url}")
         
         response = self.session.get(url)
-        print(f"DEBUG: Auth test status: {response.status_code}")
-        print(f"DEBUG: Auth test response: {response.text[:500]}")
+        self._debug(f"Auth test status: {response.status_code}")
+        self._debug(lambda: f"Auth test response: {_preview(response)}")
         
         if response.status_code == 200:
             return response.json()
         else:
             return {"error": f"HTTP {response.status_code}", "response": response.text}
     
-    def get_page_by_url(self, page_url: str) -> dict:
+    def get_page_by_url(self, page_url: str, fresh: bool = False) -> dict:
         """
         Get page content by URL.
         
         Args:
             page_url: Full URL to the Confluence page
+            fresh: Always check with the server for the current version
             
         Returns:
             Page data dictionary
@@ -98,44 +310,92 @@ class ConfluenceClient:
         if not page_id:
             raise ValueError(f"Could not extract page ID from URL: {page_url}")
         
-        return self.get_page_content(page_id)
+        return self.get_page_content(page_id, fresh=fresh)
     
-    def get_page_content(self, page_id: str) -> dict:
+    def get_page_content(self, page_id: str, fresh: bool = False) -> dict:
         """
         Get page content by ID.
+
+        Pages fetched by this client are reused for cache_ttl seconds; after
+        that they are revalidated with If-None-Match when the server sent an
+        ETag, so an unchanged page costs a 304 instead of a full body. Only
+        the last MAX_FETCHED_PAGES pages are remembered, and each caller gets
+        its own copy of a reused page.
         
         Args:
             page_id: Confluence page ID
+            fresh: Always check with the server for the current version
+                (used before updates; a 304 still reuses the fetched copy)
             
         Returns:
             Page data dictionary
         """
+        with self._fetched_lock:
+            fetched = self._fetched_pages.get(page_id)
+        if fetched is not None and not fresh and time.monotonic() - fetched[0] < self.cache_ttl:
+            self._remember_page(page_id, fetched)
+            # Strings are shared, so this copies only the small dict structure
+            return copy.deepcopy(fetched[2])
+
+        # Cache entries are per server, page and credentials
+        cache_key = f"{self.base_url}|{page_id}|{self.session.headers.get('Authorization', '')}"
+        if not fresh and self.page_cache is not None:
+            cached = self.page_cache.get(cache_key)
+            if cached is not None:
+                self._debug(f"Using cached page {page_id}")
+                return cached
+
         url = f"{self.api_base}/content/{page_id}"
         params = {
-            'expand': 'body.storage,space,version,ancestors'
+            # Only what callers read; each expansion adds server work and payload
+            'expand': 'body.storage,space,version'
         }
         
-        print(f"DEBUG: Making request to: {url}")
-        print(f"DEBUG: Request params: {params}")
-        print(f"DEBUG: Using headers: {dict(self.session.headers)}")
+        self._debug(f"Making request to: {url}")
+        self._debug(f"Request params: {params}")
+        self._debug(lambda: f"Using headers: {_redact_headers(self.session.headers)}")
         
-        response = self.session.get(url, params=params)
+        headers = {}
+        if fetched is not None and fetched[1]:
+            headers['If-None-Match'] = fetched[1]
+        response = self.session.get(url, params=params, headers=headers)
         
-        print(f"DEBUG: Response status code: {response.status_code}")
-        print(f"DEBUG: Response headers: {dict(response.headers)}")
-        print(f"DEBUG: Response content (first 500 chars): {response.text[:500]}")
+        self._debug(f"Response status code: {response.status_code}")
+        if response.status_code == 304:
+            self._debug(f"Page {page_id} not modified, reusing fetched copy")
+            self._remember_page(page_id, (time.monotonic(), fetched[1], fetched[2]))
+            return copy.deepcopy(fetched[2])
+        self._debug(lambda: f"Response headers: {dict(response.headers)}")
+        self._debug(lambda: f"Response content (first 500 chars): {_preview(response)}")
         
         if response.status_code != 200:
-            print(f"ERROR: HTTP {response.status_code}")
-            print(f"ERROR: Full response: {response.text}")
+            logger.error("HTTP %s", response.status_code)
+            logger.error("Full response: %s", response.text)
             response.raise_for_status()
         
         try:
-            return response.json()
+            # Parse the raw bytes: response.json() would first decode the whole
+            # body to a str, doubling peak memory on large pages
+            page_data = _json_loads(response.content)
         except Exception as e:
-            print(f"ERROR: Failed to parse JSON response: {e}")
-            print(f"ERROR: Full response text: {response.text}")
+            logger.error("Failed to parse JSON response: %s", e)
+            logger.error("Full response text: %s", response.text)
             raise
+
+        self._remember_page(page_id, (time.monotonic(), response.headers.get('ETag'),
+                                      copy.deepcopy(page_data)))
+        if self.page_cache is not None:
+            self.page_cache.put(cache_key, page_data)
+
+        return page_data
+
+    def _remember_page(self, page_id: str, entry: Tuple[float, Optional[str], dict]):
+        """Store a fetched page, forgetting the least recently used beyond the limit."""
+        with self._fetched_lock:
+            self._fetched_pages[page_id] = entry
+            self._fetched_pages.move_to_end(page_id)
+            while len(self._fetched_pages) > MAX_FETCHED_PAGES:
+                self._fetched_pages.popitem(last=False)
     
     def download_as_markdown(self, page_url: str, output_file: Optional[str] = None) -> str:
         """
@@ -149,7 +409,35 @@ class ConfluenceClient:
             Markdown content as string
         """
         page_data = self.get_page_by_url(page_url)
+        parts = self._markdown_document(page_data)
         
+        # Save to file if specified
+        if output_file:
+            with open(output_file, 'wb') as f:
+                self._write_markdown(parts, f)
+            logger.info("Content saved to: %s", output_file)
+        
+        return ''.join(parts)
+
+    def download_as_markdown_stream(self, page_url: str, stream: BinaryIO) -> int:
+        """
+        Download page content as markdown and write it to a binary stream.
+
+        The markdown body is still built in memory, but it is encoded and
+        written in chunks instead of as one more full-size bytes object.
+
+        Args:
+            page_url: Full URL to the Confluence page
+            stream: Binary stream to write to (e.g. sys.stdout.buffer)
+
+        Returns:
+            Number of bytes written
+        """
+        page_data = self.get_page_by_url(page_url)
+        return self._write_markdown(self._markdown_document(page_data), stream)
+
+    def _markdown_document(self, page_data: dict) -> List[str]:
+        """Build the markdown document for a page as (metadata header, body)."""
         # Extract HTML content
         html_content = page_data['body']['storage']['value']
         
@@ -167,17 +455,88 @@ class ConfluenceClient:
 ---
 
 """
-        
-        full_markdown = metadata + markdown_content
-        
-        # Save to file if specified
-        if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(full_markdown)
-            print(f"Content saved to: {output_file}")
-        
-        return full_markdown
+        return [metadata, markdown_content]
+
+    def _write_markdown(self, parts: List[str], stream: BinaryIO) -> int:
+        """Write document parts to a binary stream as UTF-8, returning the byte count."""
+        written = 0
+        for part in parts:
+            for start in range(0, len(part), _WRITE_CHUNK_CHARS):
+                data = part[start:start + _WRITE_CHUNK_CHARS].encode('utf-8')
+                stream.write(data)
+                written += len(data)
+        return written
     
+    def download_many(self, page_urls: List[str], output_dir: Optional[str] = None,
+                      max_workers: int = DEFAULT_WORKERS) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+        """
+        Download several pages as markdown concurrently.
+
+        Args:
+            page_urls: Full URLs of the Confluence pages
+            output_dir: Optional directory to save each page as <page_id>.md
+            max_workers: Number of concurrent requests
+
+        Returns:
+            (page_url, markdown, error) tuples as each page completes
+        """
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        def download(page_url):
+            output_file = None
+            if output_dir:
+                page_id = self._extract_page_id_from_url(page_url)
+                output_file = os.path.join(output_dir, f"{page_id}.md")
+            return self.download_as_markdown(page_url, output_file)
+
+        return self._map_concurrently(download, page_urls, max_workers)
+
+    def read_many(self, page_urls: List[str],
+                  max_workers: int = DEFAULT_WORKERS) -> Iterator[Tuple[str, Optional[dict], Optional[Exception]]]:
+        """
+        Read several pages concurrently.
+
+        Args:
+            page_urls: Full URLs of the Confluence pages
+            max_workers: Number of concurrent requests
+
+        Returns:
+            (page_url, page_info, error) tuples as each page completes
+        """
+        return self._map_concurrently(self.read_page_content, page_urls, max_workers)
+
+    def _map_concurrently(self, func: Callable[[str], Any], page_urls: List[str],
+                          max_workers: int) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+        """
+        Apply func to every URL on a thread pool.
+
+        Requests are I/O bound, so threads sharing this client's session (and
+        its connection pool) overlap the round-trips. A failing URL does not
+        abort the others; its exception is yielded in place of a result.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        def call(page_url):
+            try:
+                return page_url, func(page_url), None
+            except Exception as e:
+                return page_url, None, e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(call, url) for url in page_urls}
+            try:
+                # Results are handed out as they finish and then forgotten, so
+                # the caller can report each page at once and let it go
+                for future in as_completed(futures):
+                    futures.discard(future)
+                    yield future.result()
+            finally:
+                # On Ctrl-C or an abandoned iterator, don't start the pages
+                # still queued (shutdown(cancel_futures=True) needs 3.9)
+                for future in futures:
+                    future.cancel()
+
     def read_page_content(self, page_url: str) -> dict:
         """
         Read page content and return structured data.
@@ -215,25 +574,82 @@ class ConfluenceClient:
         Returns:
             Updated page data
         """
-        page_data = self.get_page_by_url(page_url)
-        
-        # Convert markdown to HTML if needed
-        if content_type == 'markdown':
-            # Simple markdown to HTML conversion
-            html_content = self._markdown_to_html(content)
-        else:
-            html_content = content
-        
-        # Get current content
-        current_content = page_data['body']['storage']['value']
-        
-        # Combine content
-        if append:
-            new_content = current_content + '\n' + html_content
-        else:
-            new_content = html_content + '\n' + current_content
-        
-        # Update page
+        import requests
+
+        html_content = self._to_storage_html(content, content_type)
+
+        # If the page is changed between our read and write, Confluence rejects
+        # the stale version with 409; re-read it and try once more
+        sent = None  # (version, body) of the previous attempt
+        for attempt in range(2):
+            page_data = self.get_page_by_url(page_url, fresh=True)
+
+            # Get current content
+            current_content = page_data['body']['storage']['value']
+
+            # A PUT retried after its response was lost gets a 409 even though
+            # the first attempt was applied; adding again would duplicate it
+            # (only an exact match proves it: the snippet may already have
+            # been on the page before)
+            if sent == (page_data['version']['number'], current_content):
+                self._debug(f"Page {page_data['id']} already has the content, not adding again")
+                return page_data
+
+            # Combine content
+            if append:
+                new_content = current_content + '\n' + html_content
+            else:
+                new_content = html_content + '\n' + current_content
+
+            sent = (page_data['version']['number'] + 1, new_content)
+            try:
+                return self.update_page(page_data, new_content)
+            except requests.HTTPError as e:
+                if attempt or e.response is None or e.response.status_code != 409:
+                    raise
+                self._debug(f"Version conflict on page {page_data['id']}, retrying")
+
+    def add_content_to_pages(self, page_urls: List[str], content: str, append: bool = True,
+                             content_type: str = 'markdown',
+                             max_workers: int = DEFAULT_WORKERS) -> Iterator[Tuple[str, Optional[dict], Optional[Exception]]]:
+        """
+        Add the same content to several pages concurrently.
+
+        Args:
+            page_urls: Full URLs of the Confluence pages
+            content: Content to add (markdown or HTML)
+            append: If True, append to existing content; if False, prepend
+            content_type: 'markdown' or 'html'
+            max_workers: Number of concurrent requests
+
+        Returns:
+            (page_url, updated page data, error) tuples as each page completes
+        """
+        # Convert once rather than once per page
+        html_content = self._to_storage_html(content, content_type)
+
+        def add(page_url):
+            return self.add_content_to_page(page_url, html_content, append, 'html')
+
+        return self._map_concurrently(add, page_urls, max_workers)
+
+    def update_page(self, page_data: dict, html_content: str) -> dict:
+        """
+        Replace the body of an existing page.
+
+        Args:
+            page_data: Current page data as returned by get_page_content
+            html_content: New page body in storage format
+
+        Returns:
+            Updated page data (page_data itself if the body is unchanged)
+        """
+        # An identical body would only add an empty version to the page history
+        if html_content == page_data['body']['storage']['value']:
+            self._debug(f"Page {page_data['id']} body unchanged, skipping update")
+            return page_data
+
+        # The version number must be incremented or the API rejects the update
         update_data = {
             'version': {
                 'number': page_data['version']['number'] + 1
@@ -242,16 +658,19 @@ class ConfluenceClient:
             'type': 'page',
             'body': {
                 'storage': {
-                    'value': new_content,
+                    'value': html_content,
                     'representation': 'storage'
                 }
             }
         }
-        
+
         url = f"{self.api_base}/content/{page_data['id']}"
-        response = self.session.put(url, json=update_data)
+        # Whatever the outcome, the fetched copy is no longer current
+        with self._fetched_lock:
+            self._fetched_pages.pop(page_data['id'], None)
+        response = self._send_json('PUT', url, update_data)
         response.raise_for_status()
-        
+
         return response.json()
 
     def create_page(self, space_key: str, title: str, content: str,
@@ -269,11 +688,7 @@ class ConfluenceClient:
         Returns:
             Created page data
         """
-        # Convert markdown to HTML if needed
-        if content_type == 'markdown':
-            html_content = self._markdown_to_html(content)
-        else:
-            html_content = content
+        html_content = self._to_storage_html(content, content_type)
 
         # Build page data
         page_data = {
@@ -295,80 +710,79 @@ class ConfluenceClient:
             page_data['ancestors'] = [{'id': parent_id}]
 
         url = f"{self.api_base}/content"
-        print(f"DEBUG: Creating page in space {space_key} with title: {title}")
+        self._debug(f"Creating page in space {space_key} with title: {title}")
 
-        response = self.session.post(url, json=page_data)
+        response = self._send_json('POST', url, page_data)
 
         if response.status_code != 200:
-            print(f"ERROR: HTTP {response.status_code}")
-            print(f"ERROR: Full response: {response.text}")
+            logger.error("HTTP %s", response.status_code)
+            logger.error("Full response: %s", response.text)
 
         response.raise_for_status()
 
         created_page = response.json()
         page_id = created_page['id']
-        print(f"✅ Page created successfully!")
-        print(f"   Title: {title}")
-        print(f"   Space: {space_key}")
-        print(f"   Page ID: {page_id}")
-        print(f"   URL: {self.base_url}/pages/viewpage.action?pageId={page_id}")
+        logger.info("✅ Page created successfully!")
+        logger.info("   Title: %s", title)
+        logger.info("   Space: %s", space_key)
+        logger.info("   Page ID: %s", page_id)
+        logger.info("   URL: %s/pages/viewpage.action?pageId=%s", self.base_url, page_id)
 
         return created_page
 
+    def _send_json(self, method: str, url: str, payload: dict):
+        """
+        Send payload as the JSON request body, gzip-compressed if enabled.
+
+        The body is pre-encoded to bytes: json= would build it as a str first
+        and then encode it again. The session already sets the Content-Type.
+        """
+        body = _json_dumps(payload)
+        headers = {}
+        if self.compress_uploads:
+            import gzip
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        return self.session.request(method, url, data=body, headers=headers)
+
     def _extract_page_id_from_url(self, page_url: str) -> Optional[str]:
         """Extract page ID from Confluence URL."""
         if not page_url:
             return None
 
-        print(f"DEBUG: Extracting page ID from URL: {page_url}")
+        self._debug(f"Extracting page ID from URL: {page_url}")
         parsed = urlparse(page_url)
-        print(f"DEBUG: Parsed URL - path: {parsed.path}, query: {parsed.query}")
-        
-        # Handle different URL formats
-        if 'pageId=' in parsed.query:
-            # Format: /pages/viewpage.action?pageId=123456
-            for param in parsed.query.split('&'):
-                if param.startswith('pageId='):
-                    page_id = param.split('=')[1]
-                    print(f"DEBUG: Found page ID from query param: {page_id}")
-                    return page_id
-        
-        # Handle other URL formats by trying to extract from path
-        path_parts = parsed.path.split('/')
-        print(f"DEBUG: Path parts: {path_parts}")
-        for i, part in enumerate(path_parts):
-            if part == 'pages' and i + 1 < len(path_parts):
-                # Look for numeric page ID in the next parts
-                for j in range(i + 1, len(path_parts)):
-                    if path_parts[j].isdigit():
-                        page_id = path_parts[j]
-                        print(f"DEBUG: Found page ID from path: {page_id}")
-                        return page_id
-        
-        print(f"DEBUG: No page ID found in URL")
+        self._debug(f"Parsed URL - path: {parsed.path}, query: {parsed.query}")
+        
+        # Format: /pages/viewpage.action?pageId=123456
+        page_id = parse_qs(parsed.query).get('pageId', [None])[0]
+        if page_id and page_id.isdigit():
+            self._debug(f"Found page ID from query param: {page_id}")
+            return page_id
+
+        # Other formats carry the ID as the first numeric segment after /pages/
+        match = _PAGE_ID_PATH_RE.search(parsed.path)
+        if match:
+            page_id = match.group(1)
+            self._debug(f"Found page ID from path: {page_id}")
+            return page_id
+
+        self._debug("No page ID found in URL")
         return None
     
     def _html_to_markdown(self, html_content: str) -> str:
         """Convert HTML to Markdown."""
-        # Clean up HTML first
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Convert to markdown
-        markdown = markdownify(
-            str(soup),
-            heading_style="ATX",
-            bullets="-",
-            strip=['script', 'style']
-        )
-        
-        return markdown.strip()
+        return _convert_html_to_markdown(html_content)
     
+    def _to_storage_html(self, content: str, content_type: str) -> str:
+        """Convert user supplied content to Confluence storage HTML."""
+        if content_type == 'markdown':
+            return self._markdown_to_html(content)
+        return content
+
     def _markdown_to_html(self, markdown_content: str) -> str:
         """Convert markdown to HTML using proper markdown parser."""
-        # Use markdown library with table support
-        md = markdown.Markdown(extensions=['tables', 'fenced_code'])
-        html_content = md.convert(markdown_content)
-        return html_content
+        return _convert_markdown_to_html(markdown_content)
     
     def edit_page_with_editor(self, page_url: str) -> dict:
         """
@@ -381,112 +795,88 @@ class ConfluenceClient:
             Updated page data
         """
         # Get current page content
-        page_data = self.get_page_by_url(page_url)
+        page_data = self.get_page_by_url(page_url, fresh=True)
         current_markdown = self._html_to_markdown(page_data['body']['storage']['value'])
         
         # Create temporary file with current content
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as temp_file:
-            temp_file.write(f"# {page_data['title']}\n\n")
-            temp_file.write("<!-- Edit the content below. Lines starting with <!-- are comments and will be ignored -->\n")
-            temp_file.write(f"<!-- Page ID: {page_data['id']}, Version: {page_data['version']['number']} -->\n\n")
-            temp_file.write(current_markdown)
+        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.md',
+                                         delete=False) as temp_file:
+            temp_file.write(
+                f"# {page_data['title']}\n\n"
+                "<!-- Edit the content below. Lines starting with <!-- are comments and will be ignored -->\n"
+                f"<!-- Page ID: {page_data['id']}, Version: {page_data['version']['number']} -->\n\n"
+                f"{current_markdown}"
+            )
             temp_file_path = temp_file.name
         
         try:
             # Detect editor
             editor = self._get_editor()
             
-            print(f"Opening editor: {editor}")
-            print(f"Editing page: {page_data['title']}")
-            print("Save and close the editor to upload changes, or exit without saving to cancel.")
+            logger.info("Opening editor: %s", editor)
+            logger.info("Editing page: %s", page_data['title'])
+            logger.info("Save and close the editor to upload changes, or exit without saving to cancel.")
             
-            # Get original file modification time
-            original_mtime = os.path.getmtime(temp_file_path)
+            # Get original file modification time; nanoseconds so an edit saved
+            # within the same second as the original write is still noticed
+            original_mtime = os.stat(temp_file_path).st_mtime_ns
             
             # Open editor
+            import subprocess
             result = subprocess.run([editor, temp_file_path])
             
             if result.returncode != 0:
-                print("Editor exited with error code. Cancelling upload.")
+                logger.warning("Editor exited with error code. Cancelling upload.")
                 return None
             
             # Check if file was modified
-            new_mtime = os.path.getmtime(temp_file_path)
+            new_mtime = os.stat(temp_file_path).st_mtime_ns
             if new_mtime == original_mtime:
-                print("File was not modified. No changes to upload.")
+                logger.info("File was not modified. No changes to upload.")
                 return None
             
-            # Read edited content
-            with open(temp_file_path, 'r') as f:
-                edited_content = f.read()
-            
-            # Remove metadata comments and title
-            lines = edited_content.split('\n')
+            # Read edited content line by line, dropping metadata comments and
+            # the title, so the whole file is never held twice
             content_lines = []
             skip_title = True
+
+            with open(temp_file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('<!--') and '-->' in line:
+                        continue  # Skip comment lines
+                    if skip_title and line.startswith('# '):
+                        skip_title = False
+                        continue  # Skip title line
+                    content_lines.append(line)
             
-            for line in lines:
-                if line.startswith('<!--') and '-->' in line:
-                    continue  # Skip comment lines
-                if skip_title and line.startswith('# '):
-                    skip_title = False
-                    continue  # Skip title line
-                content_lines.append(line)
-            
-            # Join and clean up
-            cleaned_content = '\n'.join(content_lines).strip()
+            # Join and clean up (lines keep their newlines)
+            cleaned_content = ''.join(content_lines).strip()
+
+            # Saving without changes would still create a new page version
+            if cleaned_content == current_markdown.strip():
+                logger.info("Content is unchanged. No changes to upload.")
+                return None
             
             # Convert markdown back to HTML for Confluence
             html_content = self._markdown_to_html(cleaned_content)
             
-            # Update page
-            update_data = {
-                'version': {
-                    'number': page_data['version']['number'] + 1
-                },
-                'title': page_data['title'],
-                'type': 'page',
-                'body': {
-                    'storage': {
-                        'value': html_content,
-                        'representation': 'storage'
-                    }
-                }
-            }
-            
-            url = f"{self.api_base}/content/{page_data['id']}"
-            response = self.session.put(url, json=update_data)
-            response.raise_for_status()
+            result = self.update_page(page_data, html_content)
             
-            print(f"✅ Page updated successfully!")
-            print(f"   New version: {update_data['version']['number']}")
+            logger.info("✅ Page updated successfully!")
+            logger.info("   New version: %s", result['version']['number'])
             
-            return response.json()
+            return result
             
         finally:
             # Clean up temporary file
-            if os.path.exists(temp_file_path):
+            try:
                 os.unlink(temp_file_path)
+            except FileNotFoundError:
+                pass  # the editor may have moved or removed it
     
     def _get_editor(self) -> str:
         """Get the preferred editor from environment or defaults."""
-        # Try EDITOR environment variable first
-        editor = os.environ.get('EDITOR')
-        if editor and shutil.which(editor):
-            return editor
-        
-        # Try common editors
-        editors = ['code', 'vim', 'nano', 'emacs', 'gedit', 'notepad++']
-        
-        for ed in editors:
-            if shutil.which(ed):
-                return ed
-        
-        # Last resort
-        if os.name == 'nt':  # Windows
-            return 'notepad'
-        else:
-            return 'vi'  # Should be available on all Unix systems
+        return _find_editor(os.environ.get('EDITOR'))
 
 
 class ConfigManager:
@@ -495,51 +885,85 @@ class ConfigManager:
     def __init__(self):
         self.config_dir = Path.home() / '.config' / 'confluence-markdown'
         self.config_file = self.config_dir / 'config.json'
+        # (st_mtime_ns, st_size, parsed configs) of the config file as last
+        # read or written, so lookups reparse only when the file changes
+        self._configs: Optional[Tuple[int, int, Dict[str, Dict[str, Any]]]] = None
         
     def ensure_config_dir(self):
         """Create config directory if it doesn't exist."""
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-        # Set restrictive permissions (user read/write only)
-        os.chmod(self.config_dir, 0o700)
+        # Restrictive permissions (user only) are set at creation; the umask
+        # can only narrow them. A directory created by an older version may
+        # still be group/world accessible, so tighten it only then.
+        try:
+            self.config_dir.mkdir(mode=0o700, parents=True)
+        except FileExistsError:
+            if self.config_dir.stat().st_mode & 0o077:
+                os.chmod(self.config_dir, 0o700)
     
     def save_config(self, config: Dict[str, Any], profile: str = 'default'):
         """Save configuration to file."""
         self.ensure_config_dir()
         
-        # Load existing config or create new
-        existing_config = self.load_all_configs()
+        # Load existing config or create new; copied so the cached configs
+        # stay as on disk if the write fails
+        existing_config = dict(self.load_all_configs())
         existing_config[profile] = config
         
-        # Write config file with restrictive permissions
-        with open(self.config_file, 'w') as f:
-            json.dump(existing_config, f, indent=2)
-        os.chmod(self.config_file, 0o600)
+        self._write_configs(existing_config)
         
-        print(f"✅ Configuration saved to {self.config_file} (profile: {profile})")
+        logger.info("✅ Configuration saved to %s (profile: %s)", self.config_file, profile)
     
     def load_config(self, profile: str = 'default') -> Optional[Dict[str, Any]]:
         """Load configuration from file."""
-        if not self.config_file.exists():
-            return None
-        
         try:
-            with open(self.config_file, 'r') as f:
-                all_configs = json.load(f)
-                return all_configs.get(profile)
+            return self._read_configs().get(profile)
         except Exception as e:
-            print(f"Warning: Failed to load config: {e}")
+            logger.warning("Failed to load config: %s", e)
             return None
     
     def load_all_configs(self) -> Dict[str, Dict[str, Any]]:
         """Load all configuration profiles."""
-        if not self.config_file.exists():
-            return {}
-        
         try:
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
+            return self._read_configs()
         except Exception:
             return {}
+
+    def _read_configs(self) -> Dict[str, Dict[str, Any]]:
+        """Parse the config file, reusing the last result while the file is unchanged."""
+        try:
+            st = self.config_file.stat()
+        except FileNotFoundError:
+            self._configs = None
+            return {}
+        if self._configs is not None and self._configs[:2] == (st.st_mtime_ns, st.st_size):
+            return self._configs[2]
+        with open(self.config_file, 'rb') as f:
+            configs = _json_loads(f.read())
+        self._configs = (st.st_mtime_ns, st.st_size, configs)
+        return configs
+
+    def _write_configs(self, configs: Dict[str, Dict[str, Any]]):
+        """
+        Atomically replace the config file and cache what was written.
+
+        The data goes to a temporary file in the same directory, created with
+        0600 permissions by mkstemp, which is then renamed over the config
+        file. Credentials are never readable by others, and an interrupted
+        write cannot leave a truncated config behind. A symlinked config file
+        (e.g. from a dotfiles repository) is replaced at its target, keeping
+        the link.
+        """
+        target = self.config_file.resolve()
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.config-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_json_dumps(configs, indent=True))
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        st = self.config_file.stat()
+        self._configs = (st.st_mtime_ns, st.st_size, configs)
     
     def list_profiles(self) -> list:
         """List all available configuration profiles."""
@@ -548,26 +972,308 @@ class ConfigManager:
     
     def delete_profile(self, profile: str):
         """Delete a configuration profile."""
-        configs = self.load_all_configs()
+        # Copied so the cached configs stay as on disk if the write fails
+        configs = dict(self.load_all_configs())
         if profile in configs:
             del configs[profile]
-            with open(self.config_file, 'w') as f:
-                json.dump(configs, f, indent=2)
-            print(f"✅ Profile '{profile}' deleted")
+            self._write_configs(configs)
+            logger.info("✅ Profile '%s' deleted", profile)
         else:
-            print(f"❌ Profile '{profile}' not found")
+            logger.warning("Profile '%s' not found", profile)
 
 
-def main():
-    """Main CLI function."""
+def _read_url_file(path: str) -> list:
+    """Read page URLs from a file, skipping blank lines and # comments."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f
+                if line.strip() and not line.lstrip().startswith('#')]
+
+
+def _print_page_info(page_info: dict):
+    """Print page metadata and markdown content for the read action."""
+    # The header in one write; the body separately so it is not copied
+    sys.stdout.write(
+        f"Title: {page_info['title']}\n"
+        f"Space: {page_info['space']} ({page_info['space_key']})\n"
+        f"Version: {page_info['version']}\n"
+        f"URL: {page_info['url']}\n"
+        "\nMarkdown Content:\n"
+        f"{'=' * 50}\n"
+    )
+    sys.stdout.write(page_info['markdown_content'])
+    sys.stdout.write('\n')
+
+
+def _run_bulk_action(client: ConfluenceClient, args) -> int:
+    """
+    Run the download, read or add action for every URL in --url-file.
+
+    Returns:
+        Number of URLs that failed
+    """
+    urls = _read_url_file(args.url_file)
+    if args.action == 'download':
+        # With --url-file, --output names a directory receiving <page_id>.md files
+        results = client.download_many(urls, output_dir=args.output, max_workers=args.workers)
+    elif args.action == 'add':
+        results = client.add_content_to_pages(urls, args.content, append=args.append,
+                                              content_type=args.content_type,
+                                              max_workers=args.workers)
+    else:
+        results = client.read_many(urls, max_workers=args.workers)
+
+    failures = 0
+    for page_url, result, error in results:
+        if error is not None:
+            print(f"Error: {page_url}: {error}")
+            failures += 1
+        elif args.action == 'read':
+            _print_page_info(result)
+        elif args.action == 'add':
+            print(f"Content added to {page_url}. New version: {result['version']['number']}")
+        elif not args.output:
+            print(result)
+
+    return failures
+
+
+class PageCache:
+    """Short-lived on-disk cache of fetched pages, shared between CLI runs."""
+
+    def __init__(self, ttl: float = DEFAULT_PAGE_CACHE_TTL, cache_dir: Optional[Path] = None):
+        cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        self.cache_dir = cache_dir or Path(cache_home) / 'confluence-markdown' / 'pages'
+        self.ttl = ttl
+        # time.monotonic() of the last sweep for expired entries, if any
+        self._swept_at: Optional[float] = None
+
+    def _path(self, key: str) -> Path:
+        """Map a cache key to a file name without exposing the key on disk."""
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached page, or None if missing or older than the TTL."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = _json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict):
+            return None
+        if time.time() - entry.get('ts', 0) > self.ttl:
+            # Don't keep page content on disk past its use
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+            return None
+        return entry.get('page')
+
+    def put(self, key: str, page: dict):
+        """
+        Store a page; the cache holds page content, so keep it user-only.
+
+        The cache is only an optimisation, so a page that was fetched is not
+        lost to an unwritable cache directory.
+        """
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+            fd = os.open(self._path(key), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'wb') as f:
+                f.write(_json_dumps({'ts': time.time(), 'page': page}))
+        except OSError as e:
+            logger.debug("Could not write page cache: %s", e)
+            return
+        # At most once per TTL, so bulk runs don't rescan the directory per page
+        now = time.monotonic()
+        if self._swept_at is None or now - self._swept_at >= self.ttl:
+            self._swept_at = now
+            self._sweep()
+
+    def _sweep(self):
+        """Delete expired entries, including those of pages never looked up again."""
+        cutoff = time.time() - self.ttl
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+        except OSError as e:
+            logger.debug("Could not clean page cache: %s", e)
+
+
+def _do_test_auth(args, client: ConfluenceClient):
+    """Handle --action test-auth."""
+    print("Testing authentication...")
+    auth_result = client.test_authentication()
+    if "error" not in auth_result:
+        print(f"✅ Authentication successful!")
+        print(f"   User: {auth_result.get('displayName', 'Unknown')}")
+        print(f"   Username: {auth_result.get('username', 'Unknown')}")
+        print(f"   User Key: {auth_result.get('userKey', 'Unknown')}")
+    else:
+        print(f"❌ Authentication failed: {auth_result['error']}")
+
+
+def _do_download(args, client: ConfluenceClient):
+    """Handle --action download."""
+    if args.output:
+        # Streamed to the file; the document is never joined into one string
+        with open(args.output, 'wb') as f:
+            client.download_as_markdown_stream(args.url, f)
+        logger.info("Content saved to: %s", args.output)
+    else:
+        # Write straight to the byte stream; flush pending text output first
+        sys.stdout.flush()
+        client.download_as_markdown_stream(args.url, sys.stdout.buffer)
+        sys.stdout.buffer.write(b'\n')
+        sys.stdout.buffer.flush()
+
+
+def _do_read(args, client: ConfluenceClient):
+    """Handle --action read."""
+    page_info = client.read_page_content(args.url)
+    _print_page_info(page_info)
+
+
+def _do_add(args, client: ConfluenceClient):
+    """Handle --action add."""
+    result = client.add_content_to_page(
+        args.url,
+        args.content,
+        append=args.append,
+        content_type=args.content_type
+    )
+    print(f"Content added successfully. New version: {result['version']['number']}")
+
+
+def _do_edit(args, client: ConfluenceClient):
+    """Handle --action edit."""
+    result = client.edit_page_with_editor(args.url)
+    if result is None:
+        print("Edit cancelled or no changes made.")
+
+
+def _do_create(args, client: ConfluenceClient):
+    """Handle --action create."""
+    client.create_page(
+        space_key=args.space,
+        title=args.title,
+        content=args.content,
+        parent_id=args.parent_id,
+        content_type=args.content_type
+    )
+
+
+ACTION_HANDLERS = {
+    'download': _do_download,
+    'read': _do_read,
+    'add': _do_add,
+    'edit': _do_edit,
+    'create': _do_create,
+    'test-auth': _do_test_auth,
+}
+
+
+# Arguments each action needs, checked right after parsing
+_REQUIRED_ARGS = {
+    'download': ('url',),
+    'read': ('url',),
+    'add': ('url', 'content'),
+    'edit': ('url',),
+    'create': ('space', 'title', 'content'),
+}
+
+# Flags handled without building the full argument parser
+_CONFIG_ONLY_FLAGS = ('--init-config', '--list-profiles', '--delete-profile')
+
+
+def _run_config_only(args, config_manager: ConfigManager):
+    """Run a config-only operation (init, list or delete profiles) and exit."""
+    if args.init_config:
+        config_manager.ensure_config_dir()
+        # Create config with example entries
+        example_config = {
+            "default": {
+                "base_url": "https://confluence.example.com",
+                "username": "your-username",
+                "token": "YOUR_PERSONAL_ACCESS_TOKEN_HERE"
+            },
+            "work": {
+                "base_url": "https://work.confluence.com", 
+                "username": "work-user",
+                "token": "WORK_TOKEN_HERE"
+            }
+        }
+        # O_EXCL creates the file (as 0600) only if it doesn't exist, in one
+        # step, so a config written concurrently is never overwritten
+        try:
+            fd = os.open(config_manager.config_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            print(f"ℹ️  Config file already exists at: {config_manager.config_file}")
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_json_dumps(example_config, indent=True))
+            print(f"✅ Created config file with example entries at: {config_manager.config_file}")
+            print(f"   Edit the file to add your actual credentials")
+            print(f"   Example profiles created: 'default' and 'work'")
+        sys.exit(0)
+    
+    if args.list_profiles:
+        profiles = config_manager.load_all_configs()
+        if profiles:
+            print("Available profiles:")
+            for profile, config in profiles.items():
+                print(f"  - {profile} (base_url: {config.get('base_url', 'N/A')})")
+        else:
+            print("No saved profiles found")
+        sys.exit(0)
+    
+    if args.delete_profile:
+        config_manager.delete_profile(args.profile)
+        sys.exit(0)
+
+
+class _CliFormatter(logging.Formatter):
+    """Show INFO messages as plain output and prefix other levels (DEBUG: ...)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        if record.levelno == logging.INFO:
+            return message
+        return f"{record.levelname}: {message}"
+
+
+def _configure_logging(level: int):
+    """Send log records to stdout, where the CLI's status output has always gone."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_CliFormatter())
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+
+def _handle_config_only(argv: list):
+    """Parse just the config-only flags, skipping the full CLI parser."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--init-config', action='store_true')
+    parser.add_argument('--list-profiles', action='store_true')
+    parser.add_argument('--delete-profile', action='store_true')
+    parser.add_argument('--profile', default='default')
+    args, _ = parser.parse_known_args(argv)
+    _configure_logging(logging.INFO)
+    _run_config_only(args, ConfigManager())
+
+
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the full CLI parser once; main() may be called repeatedly when imported."""
     parser = argparse.ArgumentParser(description='Confluence Data Center Markdown Tool')
     parser.add_argument('url', nargs='?', help='Confluence page URL (not required for test-auth or config operations)')
     parser.add_argument('--base-url', help='Confluence base URL')
     parser.add_argument('--username', help='Username (for basic auth)')
     parser.add_argument('--password', help='Password or API token (for basic auth)')
     parser.add_argument('--token', help='Personal Access Token (for bearer auth)')
-    parser.add_argument('--output', '-o', help='Output file for markdown')
-    parser.add_argument('--action', choices=['download', 'read', 'add', 'edit', 'create', 'test-auth'],
+    parser.add_argument('--output', '-o', help='Output file for markdown (directory with --url-file)')
+    parser.add_argument('--action', choices=list(ACTION_HANDLERS),
                        default='download', help='Action to perform')
     parser.add_argument('--content', help='Content to add (for add/create action)')
     parser.add_argument('--content-type', choices=['markdown', 'html'],
@@ -577,6 +1283,23 @@ def main():
     parser.add_argument('--prepend', dest='append', action='store_false',
                        help='Prepend content instead of append')
 
+    # Bulk options
+    parser.add_argument('--url-file',
+                       help='File with one page URL per line (download/read/add many pages)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                       help=f'Number of parallel requests for --url-file (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE,
+                       help=f'HTTP connection pool size (default: {DEFAULT_POOL_SIZE})')
+    parser.add_argument('--cache', action='store_true',
+                       help=f'Reuse pages fetched by earlier runs in the last '
+                            f'{DEFAULT_PAGE_CACHE_TTL}s (download/read; stored under ~/.cache)')
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                       help=f'Retries for rate-limited or failed requests (default: {DEFAULT_MAX_RETRIES})')
+    parser.add_argument('--debug', action='store_true',
+                       help='Print request and response diagnostics')
+    parser.add_argument('--compress-uploads', action='store_true',
+                       help='gzip page content sent to the server (add, edit, create)')
+
     # Create page options
     parser.add_argument('--space', help='Space key for creating new page (e.g., TEST, VAMP)')
     parser.add_argument('--title', help='Title for new page')
@@ -595,56 +1318,40 @@ def main():
                        help='Delete a config profile')
     parser.add_argument('--init-config', action='store_true',
                        help='Initialize empty config file structure')
-    
+
+    return parser
+
+
+def main():
+    """Main CLI function."""
+    argv = sys.argv[1:]
+    if ('-h' not in argv and '--help' not in argv
+            and any(flag in argv for flag in _CONFIG_ONLY_FLAGS)):
+        _handle_config_only(argv)
+
+    parser = _build_parser()
     args = parser.parse_args()
+
+    # With --url-file, per-page status lines are dropped; results are summarised
+    # by _run_bulk_action instead
+    if args.debug:
+        _configure_logging(logging.DEBUG)
+    else:
+        _configure_logging(logging.WARNING if args.url_file else logging.INFO)
     
     # Initialize config manager
     config_manager = ConfigManager()
     
     # Handle config-only operations
-    if args.init_config:
-        config_manager.ensure_config_dir()
-        if not config_manager.config_file.exists():
-            # Create config with example entries
-            example_config = {
-                "default": {
-                    "base_url": "https://confluence.example.com",
-                    "username": "your-username",
-                    "token": "YOUR_PERSONAL_ACCESS_TOKEN_HERE"
-                },
-                "work": {
-                    "base_url": "https://work.confluence.com", 
-                    "username": "work-user",
-                    "token": "WORK_TOKEN_HERE"
-                }
-            }
-            with open(config_manager.config_file, 'w') as f:
-                json.dump(example_config, f, indent=2)
-            os.chmod(config_manager.config_file, 0o600)
-            print(f"✅ Created config file with example entries at: {config_manager.config_file}")
-            print(f"   Edit the file to add your actual credentials")
-            print(f"   Example profiles created: 'default' and 'work'")
-        else:
-            print(f"ℹ️  Config file already exists at: {config_manager.config_file}")
-        sys.exit(0)
+    if args.init_config or args.list_profiles or args.delete_profile:
+        _run_config_only(args, config_manager)
     
-    if args.list_profiles:
-        profiles = config_manager.list_profiles()
-        if profiles:
-            print("Available profiles:")
-            for profile in profiles:
-                config = config_manager.load_config(profile)
-                print(f"  - {profile} (base_url: {config.get('base_url', 'N/A')})")
-        else:
-            print("No saved profiles found")
-        sys.exit(0)
-    
-    if args.delete_profile:
-        config_manager.delete_profile(args.profile)
-        sys.exit(0)
-    
-    # Load config if requested
-    if args.config:
+    # Load config if requested. Command-line values win over the profile, so
+    # there is nothing to read when they already cover every field that
+    # matters. A profile username would still switch a bare token to Basic
+    # auth, and a profile token takes precedence over a --password.
+    credentials_complete = args.base_url and args.username and args.token
+    if args.config and not credentials_complete:
         config = config_manager.load_config(args.profile)
         if config:
             print(f"📋 Loading config from profile: {args.profile}")
@@ -666,6 +1373,7 @@ def main():
     if args.save_config:
         # Prompt for password if not provided
         if args.username and not args.password and not args.token:
+            import getpass
             args.password = getpass.getpass(f"Password for {args.username}: ")
         
         config_data = {
@@ -690,93 +1398,39 @@ def main():
         print("       (or use --config to load from saved profile)")
         sys.exit(1)
     
+    # Validate per-action arguments before creating the client
+    for name in _REQUIRED_ARGS.get(args.action, ()):
+        if name == 'url' and args.url_file:
+            continue
+        if not getattr(args, name):
+            option = 'URL' if name == 'url' else f"--{name}"
+            parser.error(f"{option} is required for {args.action} action")
+    
     try:
         # Initialize client
         client = ConfluenceClient(
             base_url=args.base_url,
             username=args.username,
             password=args.password,
-            token=args.token
+            token=args.token,
+            pool_size=args.pool_size,
+            max_retries=args.max_retries,
+            cache_ttl=DEFAULT_PAGE_CACHE_TTL,
+            # Only read-only actions may use cached pages; updates need the current version
+            page_cache=PageCache() if args.cache and args.action in ('download', 'read') else None,
+            debug=args.debug,
+            compress_uploads=args.compress_uploads
         )
         
-        if args.action == 'test-auth':
-            print("Testing authentication...")
-            auth_result = client.test_authentication()
-            if "error" not in auth_result:
-                print(f"✅ Authentication successful!")
-                print(f"   User: {auth_result.get('displayName', 'Unknown')}")
-                print(f"   Username: {auth_result.get('username', 'Unknown')}")
-                print(f"   User Key: {auth_result.get('userKey', 'Unknown')}")
-            else:
-                print(f"❌ Authentication failed: {auth_result['error']}")
-                return
-        
-        elif args.action == 'download':
-            if not args.url:
-                print("Error: URL is required for download action")
+        if args.url_file:
+            if args.action not in ('download', 'read', 'add'):
+                print("Error: --url-file is only supported for download, read and add actions")
                 sys.exit(1)
-
-            markdown_content = client.download_as_markdown(args.url, args.output)
-            if not args.output:
-                print(markdown_content)
-
-        elif args.action == 'read':
-            if not args.url:
-                print("Error: URL is required for read action")
-                sys.exit(1)
-
-            page_info = client.read_page_content(args.url)
-            print(f"Title: {page_info['title']}")
-            print(f"Space: {page_info['space']} ({page_info['space_key']})")
-            print(f"Version: {page_info['version']}")
-            print(f"URL: {page_info['url']}")
-            print("\nMarkdown Content:")
-            print("=" * 50)
-            print(page_info['markdown_content'])
-        
-        elif args.action == 'add':
-            if not args.url:
-                print("Error: URL is required for add action")
-                sys.exit(1)
-            if not args.content:
-                print("Error: --content is required for add action")
+            if _run_bulk_action(client, args):
                 sys.exit(1)
 
-            result = client.add_content_to_page(
-                args.url, 
-                args.content,
-                append=args.append,
-                content_type=args.content_type
-            )
-            print(f"Content added successfully. New version: {result['version']['number']}")
-        
-        elif args.action == 'edit':
-            if not args.url:
-                print("Error: URL is required for edit action")
-                sys.exit(1)
-
-            result = client.edit_page_with_editor(args.url)
-            if result is None:
-                print("Edit cancelled or no changes made.")
-
-        elif args.action == 'create':
-            if not args.space:
-                print("Error: --space is required for create action")
-                sys.exit(1)
-            if not args.title:
-                print("Error: --title is required for create action")
-                sys.exit(1)
-            if not args.content:
-                print("Error: --content is required for create action")
-                sys.exit(1)
-
-            result = client.create_page(
-                space_key=args.space,
-                title=args.title,
-                content=args.content,
-                parent_id=args.parent_id,
-                content_type=args.content_type
-            )
+        else:
+            ACTION_HANDLERS[args.action](args, client)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,8 +1,9 @@
 """Tests for the main confluence-markdown functionality."""
 
+import logging
 import pytest
 from pathlib import Path
-from confluence_markdown.main import ConfluenceClient, ConfigManager
+from confluence_markdown.main import ConfluenceClient, ConfigManager, PageCache, _read_url_file
 
 
 def test_config_manager_init():
@@ -23,6 +24,11 @@ def test_url_parsing():
     test_cases = [
         ("https://example.com/pages/viewpage.action?pageId=123456", "123456"),
         ("https://example.com/spaces/SPACE/pages/123456/Page+Title", "123456"),
+        ("https://example.com/pages/viewpage.action?spaceKey=S&pageId=42&src=x", "42"),
+        ("https://example.com/pages/viewpage.action?pageId=%3742", "742"),
+        ("https://example.com/pages/edit/123456", "123456"),
+        ("https://example.com/display/SPACE/Page+Title", None),
+        ("https://example.com/pages/viewpage.action?pageId=abc", None),
     ]
     
     for url, expected_id in test_cases:
@@ -65,4 +71,507 @@ def test_client_initialization_with_username_and_token():
 def test_client_initialization_fails_without_auth():
     """Test client initialization fails without authentication."""
     with pytest.raises(ValueError, match="Either token or username/password must be provided"):
-        ConfluenceClient(base_url="https://example.com")
\ No newline at end of file
+        ConfluenceClient(base_url="https://example.com")
+
+
+def test_read_url_file_skips_blank_lines_and_comments(tmp_path):
+    """Test reading page URLs for bulk download/read."""
+    url_file = tmp_path / "pages.txt"
+    url_file.write_text(
+        "# pages to export\n"
+        "https://example.com/pages/viewpage.action?pageId=1\n"
+        "\n"
+        "  https://example.com/spaces/SPACE/pages/2/Title  \n"
+    )
+    assert _read_url_file(str(url_file)) == [
+        "https://example.com/pages/viewpage.action?pageId=1",
+        "https://example.com/spaces/SPACE/pages/2/Title",
+    ]
+
+
+def test_page_cache_roundtrip_and_expiry(tmp_path):
+    """Test that cached pages are returned until they exceed the TTL."""
+    page = {"id": "123", "title": "Cached"}
+    cache = PageCache(ttl=60, cache_dir=tmp_path)
+    assert cache.get("key") is None
+
+    cache.put("key", page)
+    assert cache.get("key") == page
+    assert cache.get("other-key") is None
+
+    expired = PageCache(ttl=-1, cache_dir=tmp_path)
+    assert expired.get("key") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_page_cache_put_removes_expired_entries(tmp_path):
+    """Test that storing a page deletes other entries older than the TTL."""
+    import os
+    import time
+
+    cache = PageCache(ttl=60, cache_dir=tmp_path)
+    cache.put("old", {"id": "1"})
+    old_file = cache._path("old")
+    stale = time.time() - 120
+    os.utime(old_file, (stale, stale))
+
+    PageCache(ttl=60, cache_dir=tmp_path).put("new", {"id": "2"})
+    assert not old_file.exists()
+    assert cache.get("new") == {"id": "2"}
+
+
+def test_page_cache_ignores_non_object_entries(tmp_path):
+    """Test that a cache file holding other JSON counts as a miss."""
+    cache = PageCache(ttl=60, cache_dir=tmp_path)
+    cache._path("key").write_text("[1, 2]")
+    assert cache.get("key") is None
+
+
+def test_page_cache_write_failure_is_not_fatal(tmp_path):
+    """Test that an unwritable cache directory does not fail the fetch."""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = PageCache(ttl=60, cache_dir=blocker / "pages")
+    cache.put("key", {"id": "1"})
+    assert cache.get("key") is None
+
+
+def test_html_to_markdown_keeps_cdata_code_blocks():
+    """Test that code macro bodies stored as CDATA survive conversion."""
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    html = (
+        '<h1>Title</h1>'
+        '<ac:structured-macro ac:name="code"><ac:plain-text-body>'
+        '<![CDATA[print("hello")]]></ac:plain-text-body></ac:structured-macro>'
+    )
+    markdown = client._html_to_markdown(html)
+    assert markdown.startswith("# Title")
+    assert 'print("hello")' in markdown
+
+
+def test_markdown_to_html_reuses_converter_between_documents():
+    """Test that a reused markdown converter does not leak state between calls."""
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    table = "| a | b |\n| --- | --- |\n| 1 | 2 |"
+    assert "<table>" in client._markdown_to_html(table)
+    assert client._markdown_to_html("plain") == "<p>plain</p>"
+    client.clear_cache()  # bypass memoization so the converter runs again
+    assert "<table>" in client._markdown_to_html(table)
+
+
+def test_session_adapter_pool_and_retries():
+    """Test that the session mounts a pooled adapter with a retry policy."""
+    client = ConfluenceClient(
+        base_url="https://example.com",
+        token="test-token",
+        pool_size=16,
+        max_retries=5
+    )
+    for prefix in ("https://", "http://"):
+        adapter = client.session.get_adapter(prefix + "example.com")
+        assert adapter.poolmanager.connection_pool_kw['maxsize'] == 32
+        assert adapter.max_retries.total == 5
+        assert 429 in adapter.max_retries.status_forcelist
+        assert "POST" not in adapter.max_retries.allowed_methods
+
+
+def test_debug_output_is_opt_in_and_masks_credentials(caplog):
+    """Test that diagnostics are only logged with debug and hide the token."""
+    caplog.set_level(logging.DEBUG, logger="confluence_markdown.main")
+    quiet = ConfluenceClient(base_url="https://example.com", token="secret-token")
+    quiet._extract_page_id_from_url("https://example.com/pages/viewpage.action?pageId=1")
+    assert caplog.records == []
+
+    import requests
+
+    client = ConfluenceClient(base_url="https://example.com", token="secret-token", debug=True)
+
+    def get(url, params, headers):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"id": "1"}'
+        return response
+
+    client.session.get = get
+    client.get_page_content("1")
+    assert all(record.levelno == logging.DEBUG for record in caplog.records)
+    assert "Using headers" in caplog.text
+    assert "secret-token" not in caplog.text
+
+
+def test_add_content_to_pages_retries_version_conflicts():
+    """Test that a 409 is retried once on the re-read page and other pages still succeed."""
+    import requests
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    reads = []
+    puts = []
+
+    def get_page_by_url(page_url, fresh=False):
+        reads.append(page_url)
+        return {
+            'id': page_url[-1],
+            'title': 'Page',
+            'version': {'number': reads.count(page_url)},
+            'body': {'storage': {'value': '<p>old</p>'}},
+        }
+
+    def request(method, url, data, headers):
+        assert method == 'PUT'
+        puts.append(url)
+        response = requests.Response()
+        response.url = url
+        # The first update of page 1 loses a race with another editor
+        response.status_code = 409 if puts == [url] and url.endswith('/1') else 200
+        response._content = data
+        return response
+
+    client.get_page_by_url = get_page_by_url
+    client.session.request = request
+    urls = [
+        "https://example.com/pages/viewpage.action?pageId=1",
+        "https://example.com/pages/viewpage.action?pageId=2",
+    ]
+    results = sorted(client.add_content_to_pages(urls, "**new**", max_workers=1))
+
+    assert [error for _, _, error in results] == [None, None]
+    assert reads == [urls[0], urls[0], urls[1]]
+    assert results[0][1]['version']['number'] == 3
+    assert "<strong>new</strong>" in results[1][1]['body']['storage']['value']
+
+
+def test_add_content_conflict_after_applied_put_does_not_duplicate():
+    """Test that a 409 from a retried PUT whose first attempt landed adds nothing twice."""
+    import requests
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    page = {
+        'id': '1',
+        'title': 'Page',
+        'version': {'number': 1},
+        'body': {'storage': {'value': '<p>old</p>'}},
+    }
+    puts = []
+
+    def request(method, url, data, headers):
+        # The first PUT was applied but urllib3 retried it and got the 409
+        puts.append(url)
+        page['version'] = {'number': 2}
+        page['body'] = {'storage': {'value': '<p>old</p>\n<p>new</p>'}}
+        response = requests.Response()
+        response.url = url
+        response.status_code = 409
+        return response
+
+    client.get_page_by_url = lambda page_url, fresh=False: dict(page)
+    client.session.request = request
+    result = client.add_content_to_page("https://example.com/pages/viewpage.action?pageId=1",
+                                        "<p>new</p>", content_type='html')
+
+    assert len(puts) == 1
+    assert result['version']['number'] == 2
+    assert result['body']['storage']['value'].count('<p>new</p>') == 1
+
+
+def test_add_content_conflict_retries_even_if_page_has_snippet():
+    """Test that a genuine conflict is retried when the page already contains the content."""
+    import requests
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    page = {
+        'id': '1',
+        'title': 'Page',
+        'version': {'number': 1},
+        'body': {'storage': {'value': '<p>+1</p>'}},
+    }
+    puts = []
+
+    def request(method, url, data, headers):
+        puts.append(data)
+        response = requests.Response()
+        response.url = url
+        if len(puts) == 1:
+            # Another editor saved version 2 first
+            page['version'] = {'number': 2}
+            page['body'] = {'storage': {'value': '<p>+1</p>\n<p>edited</p>'}}
+            response.status_code = 409
+        else:
+            response.status_code = 200
+            response._content = data
+        return response
+
+    client.get_page_by_url = lambda page_url, fresh=False: dict(page)
+    client.session.request = request
+    result = client.add_content_to_page("https://example.com/pages/viewpage.action?pageId=1",
+                                        "<p>+1</p>", content_type='html')
+
+    assert len(puts) == 2
+    assert result['version']['number'] == 3
+    assert result['body']['storage']['value'] == '<p>+1</p>\n<p>edited</p>\n<p>+1</p>'
+
+
+def test_fetched_pages_are_bounded_and_copied():
+    """Test that reused pages are private copies and old pages are forgotten."""
+    import requests
+    from confluence_markdown.main import MAX_FETCHED_PAGES
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token", cache_ttl=60)
+    gets = []
+
+    def get(url, params, headers):
+        gets.append(url)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"id": "1", "body": {"storage": {"value": "<p>x</p>"}}}'
+        return response
+
+    client.session.get = get
+    page = client.get_page_content("1")
+    page['body']['storage']['value'] = "changed"
+    assert client.get_page_content("1")['body']['storage']['value'] == "<p>x</p>"
+    assert len(gets) == 1
+
+    for page_id in range(2, MAX_FETCHED_PAGES + 2):
+        client.get_page_content(str(page_id))
+    assert len(client._fetched_pages) == MAX_FETCHED_PAGES
+    assert "1" not in client._fetched_pages
+
+
+def test_write_markdown_writes_in_chunks(monkeypatch):
+    """Test that documents are encoded and written chunk by chunk."""
+    import io
+    import confluence_markdown.main as main
+
+    monkeypatch.setattr(main, '_WRITE_CHUNK_CHARS', 4)
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    stream = io.BytesIO()
+    writes = []
+    monkeypatch.setattr(stream, 'write', lambda data: writes.append(data) or len(data))
+
+    assert client._write_markdown(["# T\n", "héllo wörld"], stream) == 17
+    assert b"".join(writes).decode('utf-8') == "# T\nhéllo wörld"
+    assert max(len(data.decode('utf-8')) for data in writes) == 4
+
+
+def test_bulk_results_are_yielded_as_pages_complete():
+    """Test that a slow page does not hold back results of pages already done."""
+    import threading
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    fast_reported = threading.Event()
+
+    def read_page_content(page_url):
+        if page_url == "slow":
+            assert fast_reported.wait(timeout=5)
+        return {'url': page_url}
+
+    client.read_page_content = read_page_content
+    results = client.read_many(["slow", "fast"], max_workers=2)
+    assert next(results) == ("fast", {'url': "fast"}, None)
+    fast_reported.set()
+    assert list(results) == [("slow", {'url': "slow"}, None)]
+
+
+def test_abandoned_bulk_iterator_skips_queued_pages():
+    """Test that closing the results iterator does not run the remaining pages."""
+    import time
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    done = []
+
+    def read_page_content(page_url):
+        time.sleep(0.01)
+        done.append(page_url)
+        return {'url': page_url}
+
+    client.read_page_content = read_page_content
+    urls = [str(i) for i in range(40)]
+    results = client.read_many(urls, max_workers=1)
+    next(results)
+    results.close()
+    assert len(done) < len(urls)
+
+
+def _etag_client(cache_ttl):
+    """Client whose session.get serves page 1 with an ETag, answering 304 when it matches."""
+    import requests
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token",
+                              cache_ttl=cache_ttl)
+    sent_headers = []
+
+    def get(url, params, headers):
+        sent_headers.append(headers)
+        response = requests.Response()
+        if headers.get('If-None-Match') == '"v1"':
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.headers['ETag'] = '"v1"'
+            response._content = b'{"id": "1", "body": {"storage": {"value": "<p>x</p>"}}}'
+        return response
+
+    client.session.get = get
+    return client, sent_headers
+
+
+def test_expired_page_is_revalidated_with_etag():
+    """Test that an expired page is revalidated and a 304 returns a private copy."""
+    client, sent_headers = _etag_client(cache_ttl=0)
+    first = client.get_page_content("1")
+    first['body']['storage']['value'] = "changed"
+
+    second = client.get_page_content("1")
+    assert sent_headers == [{}, {'If-None-Match': '"v1"'}]
+    assert second['body']['storage']['value'] == "<p>x</p>"
+    assert second is not first
+    second['body']['storage']['value'] = "changed again"
+    assert client.get_page_content("1")['body']['storage']['value'] == "<p>x</p>"
+
+
+def test_fresh_read_revalidates_within_ttl():
+    """Test that fresh=True checks with the server even while the page is reusable."""
+    client, sent_headers = _etag_client(cache_ttl=60)
+    client.get_page_content("1")
+    client.get_page_content("1")
+    assert len(sent_headers) == 1
+
+    assert client.get_page_content("1", fresh=True)['body']['storage']['value'] == "<p>x</p>"
+    assert sent_headers[-1] == {'If-None-Match': '"v1"'}
+
+
+def test_download_to_file_is_streamed(tmp_path):
+    """Test that --output writes the document through the streaming path."""
+    import argparse
+    from confluence_markdown.main import _do_download
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    client.get_page_by_url = lambda page_url: {
+        'id': '1',
+        'title': 'Page',
+        'space': {'name': 'Space'},
+        'version': {'number': 2},
+        'body': {'storage': {'value': '<p>body</p>'}},
+    }
+    client.download_as_markdown = lambda *args: pytest.fail("document joined in memory")
+    output = tmp_path / "page.md"
+
+    _do_download(argparse.Namespace(url="https://example.com/x", output=str(output)), client)
+    text = output.read_text(encoding='utf-8')
+    assert text.startswith("# Page\n")
+    assert text.endswith("body")
+
+
+def test_config_manager_rereads_config_changed_on_disk(tmp_path):
+    """Test that cached profiles are dropped when the config file changes."""
+    manager = ConfigManager()
+    manager.config_dir = tmp_path
+    manager.config_file = tmp_path / 'config.json'
+
+    assert manager.load_config() is None
+    manager.save_config({'base_url': 'https://one.example.com'})
+    assert manager.load_config()['base_url'] == 'https://one.example.com'
+    assert manager.config_file.stat().st_mode & 0o777 == 0o600
+    assert [p.name for p in tmp_path.iterdir()] == ['config.json']
+
+    manager.config_file.write_text('{"default": {"base_url": "https://two.example.com/x"}}')
+    assert manager.load_config()['base_url'] == 'https://two.example.com/x'
+
+
+def test_ensure_config_dir_tightens_existing_directory(tmp_path):
+    """Test that an existing group/world accessible config directory becomes user-only."""
+    manager = ConfigManager()
+    manager.config_dir = tmp_path / 'confluence-markdown'
+    manager.config_dir.mkdir(mode=0o755)
+    manager.config_dir.chmod(0o755)
+
+    manager.ensure_config_dir()
+    assert manager.config_dir.stat().st_mode & 0o777 == 0o700
+
+
+def test_config_manager_keeps_symlinked_config(tmp_path):
+    """Test that saving through a symlinked config file updates its target."""
+    dotfiles = tmp_path / 'dotfiles'
+    dotfiles.mkdir()
+    target = dotfiles / 'confluence.json'
+    target.write_text('{}')
+    manager = ConfigManager()
+    manager.config_dir = tmp_path / 'config'
+    manager.config_dir.mkdir()
+    manager.config_file = manager.config_dir / 'config.json'
+    manager.config_file.symlink_to(target)
+
+    manager.save_config({'base_url': 'https://example.com'})
+    assert manager.config_file.is_symlink()
+    assert 'https://example.com' in target.read_text()
+
+
+def test_delete_profile_keeps_cache_when_write_fails(tmp_path, monkeypatch):
+    """Test that a failed write does not drop the profile from the cached configs."""
+    manager = ConfigManager()
+    manager.config_dir = tmp_path
+    manager.config_file = tmp_path / 'config.json'
+    manager.save_config({'base_url': 'https://example.com'})
+
+    def fail(configs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(manager, '_write_configs', fail)
+    with pytest.raises(OSError):
+        manager.delete_profile('default')
+    assert manager.load_config() == {'base_url': 'https://example.com'}
+
+
+def test_profile_token_wins_over_command_line_password(monkeypatch):
+    """Test that --config still applies the profile token when only a password is given."""
+    import sys
+    import confluence_markdown.main as main
+
+    monkeypatch.setattr(main.ConfigManager, 'load_config',
+                        lambda self, profile='default': {'token': 'profile-token'})
+    created = {}
+
+    def client(**kwargs):
+        created.update(kwargs)
+        raise RuntimeError("stop")
+
+    monkeypatch.setattr(main, 'ConfluenceClient', client)
+    monkeypatch.setattr(sys, 'argv', [
+        'confluence-markdown', '--action', 'test-auth', '--config',
+        '--base-url', 'https://example.com', '--username', 'U', '--password', 'P',
+    ])
+    with pytest.raises(SystemExit):
+        main.main()
+    assert created['token'] == 'profile-token'
+
+
+def test_update_page_skips_unchanged_body():
+    """Test that an unchanged body is not sent as a new page version."""
+    client = ConfluenceClient(base_url="https://example.com", token="test-token")
+    client.session.request = lambda *args, **kwargs: pytest.fail("unexpected request")
+    page_data = {
+        'id': '1',
+        'title': 'Page',
+        'version': {'number': 3},
+        'body': {'storage': {'value': '<p>same</p>'}},
+    }
+    assert client.update_page(page_data, '<p>same</p>') is page_data
+
+
+def test_compressed_uploads_are_gzipped():
+    """Test that compress_uploads gzips the JSON body and labels it."""
+    import gzip
+    import json
+
+    client = ConfluenceClient(base_url="https://example.com", token="test-token",
+                              compress_uploads=True)
+    sent = {}
+
+    def request(method, url, data, headers):
+        sent.update(data=data, headers=headers)
+
+    client.session.request = request
+    client._send_json('POST', "https://example.com/rest/api/content", {'title': 'T'})
+
+    assert sent['headers'] == {'Content-Encoding': 'gzip'}
+    assert json.loads(gzip.decompress(sent['data'])) == {'title': 'T'}